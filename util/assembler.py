@@ -43,11 +43,15 @@ Label:  JMP Ret ; Perform very complicated calculations
 
 
 import os
+import re
+import sys
 import enum
 import logging
 import argparse
-import contextlib
+import functools
+import itertools
 from collections import namedtuple
+from dataclasses import dataclass
 
 
 def getArgumentParser():
@@ -121,145 +125,188 @@ def asmReaderGenerator(file_path: str) -> (Generator | list):
     
     def generator():
         nonlocal file_path
-        with contextlib.closing(open(file_path)) as source_file:
-            for line in source_file:
-                if line.strip().startswith(';') or line == '\n':
-                    continue
-                yield line.strip()
+        # Read the whole file at once, then split it in memory
+        with open(file_path) as source_file:
+            data: str = source_file.read()
+
+        # Universal newlines already turned every line ending into '\n';
+        # Split on it alone, as iterating the file did, and drop the
+        # empty piece after a final newline
+        lines: list[str] = data.split('\n')
+        if lines[-1] == "":
+            lines.pop()
+
+        for line in lines:
+            # Strip once; Skip blank lines and comment lines
+            stripped: str = line.strip()
+            if not stripped or stripped[0] == ';':
+                continue
+            yield stripped
     
     return generator()
 
 
-def caselessCompare(s1: str, s2: str) -> bool:
-    return s1.casefold() == s2.casefold()
-
-
-def caselessIn(s: str, container: Iterable[str]) -> bool:
-    for e in container:
-        if caselessCompare(s, e):
-            return True
-    else:
-        return False
-
-
 class Token:
     """ Smallest unit of text that convey meanings. """
 
+    # Plain ints underneath, so type checks are cheap int compares
     @enum.unique
-    class TokenType(enum.Enum):
-        SPECIAL    = "Special"
-        NUMBER     = "Number"
-        IDENTIFIER = "Identifier"
+    class TokenType(enum.IntEnum):
+        SPECIAL    = 0
+        NUMBER     = 1
+        IDENTIFIER = 2
 
         def __str__(self) -> str:
-            return self.value
+            return self.name.capitalize()
 
     special_tokens: list[str] = [".", ":", ",", ";"]
+    special_tokens_set: frozenset[str] = frozenset(special_tokens)
 
-    def __init__(self, type: TokenType, value: str) -> None:
-        self.type: Token.TokenType = type
-        self.value: str = value
+    # No per-token __dict__; Tokens are created for every word of every line
+    __slots__ = ('type', 'value', 'kind', '_cf')
 
-        if not self.validateToken():
+    type : Token.TokenType
+    value: str
+    kind : int              # Classification mask, see _tokenKind
+    _cf  : (str | None)     # Casefolded value, filled in lazily
+
+    @staticmethod
+    def validateSpecial(value: str) -> bool:
+        return value in Token.special_tokens_set
+
+    @staticmethod
+    def validateNumber(value: str) -> bool:
+        return value.isnumeric()
+
+    @staticmethod
+    def validateIdentifier(value: str) -> bool:
+        return (
+            not Token.validateSpecial(value) and
+            not Token.validateNumber(value)
+        )
+
+    # Validator for each token type; Looked up once per token
+    _validators: dict[TokenType, Callable[[str], bool]] = {
+        TokenType.SPECIAL   : validateSpecial,
+        TokenType.NUMBER    : validateNumber,
+        TokenType.IDENTIFIER: validateIdentifier
+    }
+
+    def __init__(self, type: TokenType, value: str) -> None:
+        if not Token._validators[type](value):
             raise ValueError(
                 "Given token type and value does not match."
             )
-    
+
+        self.type = type
+        self.value = value
+        self._cf = None
+        self.kind = _tokenKind(type, self.cf if type == _T_IDENT else None)
+
+    @classmethod
+    def _make(cls, type: TokenType, value: str, kind: int) -> Token:
+        """
+        Create a token without validation;
+        Only for callers that already guarantee type, value and kind match.
+        """
+
+        token: Token = cls.__new__(cls)
+        token.type = type
+        token.value = value
+        token.kind = kind
+        token._cf = None
+        return token
+
+    @property
+    def cf(self) -> str:
+        """ Casefolded value; Computed and interned once per token. """
+
+        if self._cf is None:
+            self._cf = sys.intern(self.value.casefold())
+        return self._cf
+
     def validateToken(self) -> bool:
         """ Validate the type and value of token. """
-        
-        def validateSpecial(value: str) -> bool:
-            return value in Token.special_tokens
-        
-        def validateNumber(value: str) -> bool:
-            return value.isnumeric()
-        
-        def validateIdentifier(value: str) -> bool:
-            return (
-                not validateSpecial(value) and 
-                not validateNumber(value)
-            )
-        
-        if self.type == Token.TokenType.SPECIAL:
-            return validateSpecial(self.value)
-        elif self.type == Token.TokenType.NUMBER:
-            return validateNumber(self.value)
-        else:
-            return validateIdentifier(self.value)
-        
+        return Token._validators[self.type](self.value)
+
     def __str__(self) -> str:
         return f"Token Type: {self.type}\nToken Value: '{self.value}'"
 
 
-def lexer(loc: str) -> list[Token]:
+# Token types bound at module scope for the lexer and parser hot paths
+_T_SPECIAL = Token.TokenType.SPECIAL
+_T_NUMBER  = Token.TokenType.NUMBER
+_T_IDENT   = Token.TokenType.IDENTIFIER
+
+
+# Compiled once; Only spaces, tabs and special tokens end a run.
+# The group that matched tells whether it is a run or a special token.
+_TOK_RE: re.Pattern = re.compile(r"([^ \t.,:]+)|([.,:])")
+
+
+def _keepChar(char: str) -> bool:
     """
-    Given a line of code, the function parse the string
-    into a stream of tokens.
+    Digits and letters, in any script, are kept in a run; Any other
+    character is dropped without ending it, so 'my_label' reads as 'mylabel'.
     """
 
-    result: list[Token] = list()
-
-    # The stack to keep track of identifiers and numbers
-    stack: str = ""
+    return char.isdigit() or char.isalpha()
 
-    def recordStack(stack: str, result: list[Token]) -> None:
-        """ Pushback stack into result. """
 
-        if stack == "":
-            return
-        
-        result.append(
-            Token(
-                type=Token.TokenType.NUMBER, 
-                value=stack
-            )
-            if stack.isnumeric() else
-            Token(
-                type=Token.TokenType.IDENTIFIER,
-                value=stack
-            )
-        )
+def lex_iter(loc: str) -> Iterator[Token]:
+    """
+    Given a line of code, the function yields the tokens
+    of the line one by one.
+    """
 
-    for char in loc:
-        # Special case - char is ';'
-        if char == ';':
-            break
-        
-        # case 1 - char is a special token
-        if char in Token.special_tokens:
-            # when meet a special token,
-            # whats stored in stack needs to be recorded
-            recordStack(stack, result)
-            stack = ""
-            
-            # then append the special token
-            result.append(
-                Token(
-                    type=Token.TokenType.SPECIAL,
-                    value=char
-                )
-            )
+    # ';' starts a comment; Find it with a single C-level search
+    # and stop the scan there, without slicing the line
+    end: int = loc.find(';')
+    if end < 0:
+        end = len(loc)
+
+    # Bind the lookups used for every token once per line
+    make = Token._make
+    intern = sys.intern
+    classify = _classify
+
+    # Let the regex engine split the whole line in C; findall hands back
+    # plain (run, special) tuples, with no Match objects
+    for run, special in _TOK_RE.findall(loc, 0, end):
+        if special:
+            yield make(_T_SPECIAL, special, _TK_SPECIAL)
             continue
 
-        # case 2 - char is a seperator
-        if char == ' ' or char == '\t':
-            # when meet a seperator (such as space or tab)
-            # record content in the stack
-            recordStack(stack, result)
-            stack = ""
-            continue
+        # Most runs are plain ASCII words, all kept as is;
+        # Only the others need filtering one character at a time
+        if not (run.isascii() and run.isalnum()):
+            run = "".join(filter(_keepChar, run))
+            if not run:
+                continue
 
-        # case 3, 4 - char is a digit or character
-        if char.isdigit() or char.isalpha():
-            # simply push the character onto the stack
-            stack += char
-            continue
-    
-    # At the end of line, push what's left in stack
-    recordStack(stack, result)
-    stack = ""
+        if run.isnumeric():
+            yield make(_T_NUMBER, run, _TK_NUMBER)
+        else:
+            cf: str = intern(run.casefold())
+
+            # Registers and labels recur on almost every line and end up as
+            # instruction fields and symbol table keys; Intern them so later
+            # comparisons and lookups can short-circuit on identity
+            identifier: str = intern(run)
+
+            # Classify once here; Keywords.is* then only test bits
+            token: Token = make(_T_IDENT, identifier, _TK_IDENT | (classify(cf) or _KW_LABEL))
+            token._cf = cf
+            yield token
+
+
+def lexer(loc: str) -> list[Token]:
+    """
+    Given a line of code, the function parse the string
+    into a stream of tokens.
+    """
 
-    return result
+    return list(lex_iter(loc))
 
 
 class CustomeLoggingFormatter(logging.Formatter):
@@ -284,9 +331,15 @@ class CustomeLoggingFormatter(logging.Formatter):
             logging.ERROR   : self.ConsoleColor.red + self.fmt + self.ConsoleColor.reset
         }
 
+        # One formatter per level, built once instead of once per record;
+        # Other levels fall back to the plain default format
+        self._formatters = {
+            level: logging.Formatter(log_fmt) for level, log_fmt in self.FORMAT.items()
+        }
+        self._default_formatter = logging.Formatter()
+
     def format(self, record):
-        log_fmt = self.FORMAT.get(record.levelno)
-        formatter = logging.Formatter(log_fmt)
+        formatter = self._formatters.get(record.levelno, self._default_formatter)
         return formatter.format(record)
 
 
@@ -306,6 +359,10 @@ def getConfigedLogger(level: int, fmt: str) -> logging.Logger:
     return logger
 
 
+# Module wide logger; Configured once by getConfigedLogger in main
+_log: logging.Logger = logging.getLogger(__name__)
+
+
 class Keywords:
     """ Contain all allowed keywords. """
 
@@ -366,56 +423,85 @@ class Keywords:
         'PC'    #      Program Counter
     )
 
+    # Casefolded keywords, so a lookup only needs to casefold the token;
+    # Interned like the casefolded token values, so hits compare by identity
+    _segments_cf : frozenset[str] = frozenset(sys.intern(s.casefold()) for s in segments)
+    _opcodes_cf  : frozenset[str] = frozenset(sys.intern(s.casefold()) for s in OpCode)
+    _registers_cf: frozenset[str] = frozenset(sys.intern(s.casefold()) for s in registers)
+
     @classmethod
     def isKeyword(cls, token: Token) -> bool:
         """ Check if a token is a keyword token. """
 
-        if token.type != Token.TokenType.IDENTIFIER:
-            return False
-        
-        # Using caselessIn to ignore case differences
-        return (
-            caselessIn(token.value, cls.segments) or
-            caselessIn(token.value, cls.OpCode)   or
-            caselessIn(token.value, cls.registers)
-        )
+        return bool(token.kind & _KW_ANY)
     
     @classmethod
     def isLabel(cls, token: Token) -> bool:
         """ Check if a token is a label token. """
 
-        if token.type != Token.TokenType.IDENTIFIER:
-            return False
-        
         # An identifier can only be a label or a keyword.
-        return not cls.isKeyword(token)
+        return bool(token.kind & _KW_LABEL)
     
     @classmethod
     def isSegment(cls, token: Token) -> bool:
         """ Check if a token is a segment token. """
 
-        if token.type != Token.TokenType.IDENTIFIER:
-            return False
-        
-        return caselessIn(token.value, cls.segments)
+        return bool(token.kind & _KW_SEGMENT)
     
     @classmethod
     def isOpcode(cls, token: Token) -> bool:
         """ Check if a token is a opcode token. """
 
-        if token.type != Token.TokenType.IDENTIFIER:
-            return False
-        
-        return caselessIn(token.value, cls.OpCode)
+        return bool(token.kind & _KW_OPCODE)
     
     @classmethod
     def isRegister(cls, token: Token) -> bool:
         """ Check if a token is a register token. """
 
-        if token.type != Token.TokenType.IDENTIFIER:
-            return False
-        
-        return caselessIn(token.value, cls.registers)
+        return bool(token.kind & _KW_REGISTER)
+
+
+# Keyword classes, as bits of the mask returned by _classify
+_KW_SEGMENT  = 1
+_KW_OPCODE   = 2
+_KW_REGISTER = 4
+_KW_ANY      = _KW_SEGMENT | _KW_OPCODE | _KW_REGISTER
+
+# Further bits of Token.kind; An identifier that is no keyword is a label,
+# and exactly one of the token type bits is set on every token
+_KW_LABEL   = 8
+_TK_SPECIAL = 16
+_TK_NUMBER  = 32
+_TK_IDENT   = 64
+
+
+@functools.lru_cache(maxsize=4096)
+def _classify(cf: str) -> int:
+    """
+    Classify a casefolded identifier into a mask of keyword classes;
+    Zero means the identifier is a label. Cached, since the same few
+    opcodes, registers and labels show up on nearly every line.
+    """
+
+    mask: int = 0
+
+    if cf in Keywords._segments_cf:
+        mask |= _KW_SEGMENT
+    if cf in Keywords._opcodes_cf:
+        mask |= _KW_OPCODE
+    if cf in Keywords._registers_cf:
+        mask |= _KW_REGISTER
+
+    return mask
+
+
+def _tokenKind(type: Token.TokenType, cf: (str | None)) -> int:
+    """ Compute the Token.kind mask from the type and casefolded value. """
+
+    if type == _T_IDENT:
+        return _TK_IDENT | (_classify(cf) or _KW_LABEL)
+    
+    return _TK_NUMBER if type == _T_NUMBER else _TK_SPECIAL
 
 
 def exitProgram(exit_code: int) -> None:
@@ -433,110 +519,59 @@ def exitProgram(exit_code: int) -> None:
 class DataSegment:
     """ Parse and record relavant information about data segment. """
 
-    def __init__(self, logger: logging.Logger) -> None:
+    def __init__(self) -> None:
         """ Initialize data container. """
 
         # Label as key - Label values as value
         self.value_table: dict[str, list[int]] = dict()
 
-        # logging facility
-        self.logger: logging.Logger = logger
-
-    class StateMachine:
-        """ Use state machine to check for grammer validity. """
-
-        @enum.unique
-        class States(enum.Enum):
-            NUMBER = enum.auto()
-            COMMA  = enum.auto()
-
-        def reset(self) -> None:
-            """ Reset current state to starting state. """
-            self.state = DataSegment.StateMachine.States.NUMBER
+        # Label as key - Address within the segment as value;
+        # Kept up to date by parse, together with the segment size
+        self.symbol_table: dict[str, int] = dict()
+        self.segment_size: int = 0
 
-        def __init__(self) -> None:
-            self.state: DataSegment.StateMachine.States
-            
-            # Initialize by reseting
-            self.reset()
-
-        def update(self, token: Token) -> bool:
-            """ 
-            Update current state with token;
-            Then return validity.
-            """
-
-            # Two state state-machine:
-            #              _____NUMBER___
-            #        _____|___       ____v_____
-            #       |         |     |          |
-            #  <----|  NUMBER |     |   COMMA  |__else__-> Error
-            #       |_________|     |__________|
-            #             ^_____COMMA____|
-
-            def isNumber(token: Token) -> bool:
-                return token.type == Token.TokenType.NUMBER
-            
-            def isComma(token: Token) -> bool:
-                return (
-                    token.type == Token.TokenType.SPECIAL and
-                    token.value == ","
-                )
-
-            if self.state == DataSegment.StateMachine.States.NUMBER:
-                # Expect token to be a number
-                if isNumber(token):
-                    self.state = DataSegment.StateMachine.States.COMMA
-                    return True
-                else:
-                    return False
-            
-            elif self.state == DataSegment.StateMachine.States.COMMA:
-                # Expect token to be a comman
-                if isComma(token):
-                    self.state = DataSegment.StateMachine.States.NUMBER
-                    return True
-                else:
-                    return False
-            
-            # Anything else happend, return False anyways
-            return False
-
-    def parse(self, token_stream: list[Token]) -> None:
+    def parse(self, token_stream: Iterable[Token]) -> None:
         """ Parse the token stream. """
 
         # The pattern goes like: label1: n1, n2, n3, n4, ...
         # Where label MUST NOT be a keyword.
 
+        # Walk the stream with an iterator; Tokens may come
+        # straight from the lexer without a list in between
+        tokens: Iterator[Token] = iter(token_stream)
+
+        # Only the first three tokens are needed to validate the length
+        head: list[Token] = list(itertools.islice(tokens, 3))
+
         # Validate the length of token stream
-        if len(token_stream) < 3:
-            self.logger.error(
+        if len(head) < 3:
+            _log.error(
                 "DataSegment: Not enough token to analyze."
             )
             exitProgram(1)
             return
 
         # The first token must be a label
-        identifier: Token = token_stream.pop(0)
+        identifier: Token = head[0]
 
         if not Keywords.isLabel(identifier):
-            self.logger.error(
+            _log.error(
                 "DataSegment: Data declarations not start with a label."
             )
             exitProgram(1)
             return
         
         # Label must not be defined before
-        if identifier.value in self.value_table.keys():
-            self.logger.error("DataSegment: Label redefinition.")
+        if identifier.value in self.value_table:
+            _log.error("DataSegment: Label redefinition.")
             exitProgram(1)
             return
         
-        separator: Token = token_stream.pop(0)
+        separator: Token = head[1]
 
-        if (separator.type  != Token.TokenType.SPECIAL or
+        if (separator.type  != _T_SPECIAL or
             separator.value != ":"):
-            self.logger.error(
+            _log.error(
                 "DataSegment: No ':' following label declaration."
             )
             exitProgram(1)
@@ -544,100 +579,107 @@ class DataSegment:
         
         # Now the token stream only contains "n1, n2, n3, n4, ..."
 
-        # Use state machine to validate syntax
-        sm = DataSegment.StateMachine()
-
-        values: list[Token] = list()
+        # Two state state-machine, kept as a boolean toggle:
+        #              _____NUMBER___
+        #        _____|___       ____v_____
+        #       |         |     |          |
+        #  <----|  NUMBER |     |   COMMA  |__else__-> Error
+        #       |_________|     |__________|
+        #             ^_____COMMA____|
+        expect_number: bool = True
+
+        values: list[int] = list()
+        append = values.append
+
+        # Validate and convert the numbers in a single pass
+        for token in itertools.chain((head[2],), tokens):
+            if expect_number:
+                # Expect token to be a number
+                valid = token.type == _T_NUMBER
+            else:
+                # Expect token to be a comma
+                valid = (
+                    token.type == _T_SPECIAL and
+                    token.value == ","
+                )
 
-        for token in token_stream:
             # Check syntax error
-            if not sm.update(token):
-                self.logger.error(
+            if not valid:
+                _log.error(
                     "DataSegment: "
                     "Declaration not follow the pattern 'n1, n2, n3, ...'."
                 )
                 exitProgram(1)
                 return
-            
-            # Store tokens
-            if token.type == Token.TokenType.NUMBER:
-                values.append(token)
-        
-        # Populate value table
-        self.value_table[identifier.value] = list()
 
-        for token in values:
-            try:
-                self.value_table[identifier.value].append(
-                    int(token.value)
-                )
-            except ValueError:
-                self.logger.error(
-                    "DataSegment: Some data is not integer."
-                )
-                exitProgram(1)
-                return
+            # Store numbers; int() still rejects runs longer than
+            # sys.get_int_max_str_digits()
+            if expect_number:
+                try:
+                    append(int(token.value, 10))
+                except ValueError:
+                    _log.error(
+                        "DataSegment: Some data is not integer."
+                    )
+                    exitProgram(1)
+                    return
+
+            expect_number = not expect_number
+
+        # Populate value table and symbol table
+        self.value_table[identifier.value] = values
+        self.symbol_table[identifier.value] = self.segment_size
+        self.segment_size += len(values)
         
         return
     
     def size(self) -> int:
-        """ Calculate the size of this segment. """
+        """ Size of this segment. """
 
-        segment_size: int = 0
-
-        for label, data in self.value_table.items():
-            assert isinstance(data, list)
-            segment_size += len(data)
-
-        return segment_size
+        return self.segment_size
     
     def symbolTable(self) -> dict[str, int]:
-        """ Parse value table into a local symbol table. """
-
-        symbol_table: dict[str, int] = dict()
-
-        # Keep track of current address
-        curr_address: int = 0
+        """ Local symbol table of this segment; Not to be modified. """
 
-        for label, data in self.value_table.items():
-            assert isinstance(data, list)
-
-            symbol_table[label] = curr_address
-            curr_address += len(data)
-        
-        return symbol_table
+        return self.symbol_table
 
 
 class ExtraSegment:
     """ Parse and record relavant information about extra segment. """
 
-    def __init__(self, logger: logging.Logger) -> None:
+    def __init__(self) -> None:
         """ Initialize data container. """
 
         # Label as key - Label value as value
         self.value_table: dict[str, int] = dict()
 
-        # logging facility
-        self.logger: logging.Logger = logger
+        # Label as key - Address within the segment as value;
+        # Kept up to date by parse, together with the segment size
+        self.symbol_table: dict[str, int] = dict()
+        self.segment_size: int = 0
 
-    def parse(self, token_stream: list[Token]) -> None:
+    def parse(self, token_stream: Iterable[Token]) -> None:
         """ Parse the token stream. """
 
         # The pattern goes like: label1: number
         # Where label MUST NOT be a keyword.
 
-        if len(token_stream) != 3:
-            self.logger.error(
+        # Tokens may come straight from the lexer; One token past
+        # the pattern is enough to tell the stream is too long
+        head: list[Token] = list(itertools.islice(token_stream, 4))
+
+        if len(head) != 3:
+            _log.error(
                 "ExtraSegment: Wrong number of tokens to analyze."
             )
             exitProgram(1)
             return
         
         # The first token must be a label
-        identifier: Token = token_stream.pop(0)
+        identifier: Token = head[0]
     
         if not Keywords.isLabel(identifier):
-            self.logger.error(
+            _log.error(
                 "ExtraSegment: "
                 "Space declaration not start with a label."
             )
@@ -645,26 +687,26 @@ class ExtraSegment:
             return
 
         # Label must not be defined before
-        if identifier.value in self.value_table.keys():
-            self.logger.error("ExtraSegment: Label redefinition.")
+        if identifier.value in self.value_table:
+            _log.error("ExtraSegment: Label redefinition.")
             exitProgram(1)
             return
         
-        separator: Token = token_stream.pop(0)
+        separator: Token = head[1]
 
-        if (separator.type  != Token.TokenType.SPECIAL or
+        if (separator.type  != _T_SPECIAL or
             separator.value != ":"):
-            self.logger.error(
+            _log.error(
                 "ExtraSegment: No ':' following label declaration."
             )
             exitProgram(1)
             return
         
-        # Now the token stream only contains one token "number"
-        assert len(token_stream) == 1
+        # The last token must be the number
+        number: Token = head[2]
 
-        if token_stream[0].type != Token.TokenType.NUMBER:
-            self.logger.error(
+        if number.type != _T_NUMBER:
+            _log.error(
                 "ExtraSegment: "
                 "Expecting a number token after label declaration."
             )
@@ -673,43 +715,62 @@ class ExtraSegment:
         
         # Populate value table
         try:
-            self.value_table[identifier.value] = int(
-                token_stream[0].value
-            )
+            space: int = int(number.value)
         except ValueError:
-            self.logger.error(
+            _log.error(
                 "ExtraSegment: Data is not integer."
             )
             exitProgram(1)
             return
         
+        self.value_table[identifier.value] = space
+
+        # The label addresses the start of its space
+        self.symbol_table[identifier.value] = self.segment_size
+        self.segment_size += space
+        
         return
     
     def size(self) -> int:
-        """ Calculate the size of this segment. """
-
-        segment_size: int = 0
+        """ Size of this segment. """
 
-        for label, space in self.value_table.items():
-            segment_size += space
-
-        return segment_size
+        return self.segment_size
     
     def symbolTable(self) -> dict[str, int]:
-        """ Parse value table into a local symbol table. """
+        """ Local symbol table of this segment; Not to be modified. """
 
-        symbol_table: dict[str, int] = dict()
+        return self.symbol_table
 
-        # Record the space used by previous declarations
-        prev_space: int = 0
 
-        for label, space in self.value_table.items():
-            symbol_table[label] = prev_space
-            prev_space += space
+@enum.unique
+class InstructionType(enum.Enum):
+    """ Enum class for the type of instructions. """
 
-        return symbol_table
+    # R_type: 2 source registers, 1 dest registers, no imm; Binary operations
+    # ADD Rd, Rs, Rm ; MUL Rd, Rs, Rm
+    Rt = "R Type"
+
+    # I_type: 1 source register, 1 dest register, 1 imm; Binary operations, with imm
+    # ADD Rd, Rs, imm
+    It = "I Type"
 
+    # U_type: 1 source register, 1 dest register, 0 imm; Unary operations
+    # NEG Rd, Rs ; NOT Rd, Rs ; LDR Rd, Rs ; STR Rd, Rs
+    Ut = "U Type"
 
+    # S_type: 0 source register, 1 dest register, 0 imm (only for stack operations)
+    # PUSH Rd ; POP Rd
+    St = "S Type"
+
+    # J_type: 0 source register, 0 dest register 1 imm (only for branching)
+    # JMP imm ; JEQ imm
+    Jt = "J Type"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+@dataclass(slots=True)
 class Instruction:
     """ Container class for single instruction. """
 
@@ -720,53 +781,25 @@ class Instruction:
     # \_____________________|_/	       |		  |				  |				|
     #			imm			 Rn		   Rm		  Rd			 OpCode		  OpType
 
-    @enum.unique
-    class InstructionType(enum.Enum):
-        """ Enum class for the type of instructions. """
-
-        # R_type: 2 source registers, 1 dest registers, no imm; Binary operations
-        # ADD Rd, Rs, Rm ; MUL Rd, Rs, Rm
-        Rt = "R Type"
-
-        # I_type: 1 source register, 1 dest register, 1 imm; Binary operations, with imm
-        # ADD Rd, Rs, imm
-        It = "I Type"
-
-        # U_type: 1 source register, 1 dest register, 0 imm; Unary operations
-        # NEG Rd, Rs ; NOT Rd, Rs ; LDR Rd, Rs ; STR Rd, Rs
-        Ut = "U Type"
-
-        # S_type: 0 source register, 1 dest register, 0 imm (only for stack operations)
-        # PUSH Rd ; POP Rd
-        St = "S Type"
-
-        # J_type: 0 source register, 0 dest register 1 imm (only for branching)
-        # JMP imm ; JEQ imm
-        Jt = "J Type"
-
-        def __str__(self) -> str:
-            return self.value
-    
     # Loop up table for Opcode type
-    type_lut: dict[InstructionType, int] = {
+    type_lut: ClassVar[dict[InstructionType, int]] = {
         InstructionType.Rt: 0,
         InstructionType.It: 1,
         InstructionType.Ut: 2,
         InstructionType.St: 3,
         InstructionType.Jt: 4
     }
-    
-    def __init__(self) -> None:
-        # What's won't be in binary
-        self.label: str = None
-
-        # What's will be in binary
-        self.type: Instruction.InstructionType = None
-        self.code: str = None
-        self.Rd: str = None
-        self.Rm: str = None
-        self.Rn: str = None
-        self.imm: (str | int) = None
+
+    # What's won't be in binary
+    label: (str | None) = None
+
+    # What's will be in binary
+    type: (InstructionType | None) = None
+    code: (str | None) = None
+    Rd: (str | None) = None
+    Rm: (str | None) = None
+    Rn: (str | None) = None
+    imm: (str | int | None) = None
     
     def __str__(self) -> str:
         """ String rep of instruction """
@@ -786,331 +819,329 @@ class Instruction:
         )
 
 
-class TextSegment:
-    """ Parse and record information about text segment. """
+# States of the text segment state machine
+_ST_OTHER, _ST_COMMA = 0, 1
 
-    def __init__(self, logger: logging.Logger) -> None:
-        """ Initialize data container. """
+# Kinds of operand tokens fed to the state machine
+_KIND_OTHER, _KIND_COMMA, _KIND_ELSE = 0, 1, 2
 
-        # Sequentially stores instructions
-        self.instruction: list[Instruction] = list()
+# Token.kind bits of operands classified as other
+_KIND_OTHER_MASK = _KW_REGISTER | _TK_NUMBER | _KW_LABEL
+
+# Transitions of the text segment state machine;
+# (state, token kind) -> next state, any missing pair is a syntax error
+_TEXT_TRANS: dict[tuple[int, int], int] = {
+    (_ST_OTHER, _KIND_OTHER): _ST_COMMA,
+    (_ST_COMMA, _KIND_COMMA): _ST_OTHER
+}
+
+
+def _immediate(token: Token) -> int:
+    """ Convert a number operand into the integer imm. """
+
+    try:
+        return int(token.value)
+    except ValueError:
+        _log.error(
+            "TextSegment: "
+            "Failed to convert imm to integer."
+        )
+        exitProgram(1)
+        return
+
+
+def _setRType(inst: Instruction, value_list: list[Token]) -> None:
+    """ Rd, Rm, Rn; R-type. """
+
+    inst.type = InstructionType.Rt
+    inst.Rd = value_list[0].value
+    inst.Rm = value_list[1].value
+    inst.Rn = value_list[2].value
+
+
+def _setITypeLabel(inst: Instruction, value_list: list[Token]) -> None:
+    """ Rd, Rm, label; I-type. """
+
+    inst.type = InstructionType.It
+    inst.Rd = value_list[0].value
+    inst.Rm = value_list[1].value
+    inst.imm = value_list[2].value
+
+
+def _setITypeNumber(inst: Instruction, value_list: list[Token]) -> None:
+    """ Rd, Rm, number; I-type. """
+
+    inst.type = InstructionType.It
+    inst.Rd = value_list[0].value
+    inst.Rm = value_list[1].value
+    inst.imm = _immediate(value_list[2])
+
+
+def _setUType(inst: Instruction, value_list: list[Token]) -> None:
+    """ Rd, Rm; U-type. """
+
+    inst.type = InstructionType.Ut
+    inst.Rd = value_list[0].value
+    inst.Rm = value_list[1].value
+
+
+def _setSType(inst: Instruction, value_list: list[Token]) -> None:
+    """ Rd; S-type. """
+
+    inst.type = InstructionType.St
+    inst.Rd = value_list[0].value
+
+
+def _setJTypeLabel(inst: Instruction, value_list: list[Token]) -> None:
+    """ label; J-type. """
+
+    inst.type = InstructionType.Jt
+    inst.imm = value_list[0].value
+
+
+def _setJTypeNumber(inst: Instruction, value_list: list[Token]) -> None:
+    """ number; J-type. """
+
+    inst.type = InstructionType.Jt
+    inst.imm = _immediate(value_list[0])
+
+
+# Every operand is exactly one of register, label or number;
+# Masking Token.kind with these bits gives its operand tag
+_OPERAND_TAGS = _KW_REGISTER | _KW_LABEL | _TK_NUMBER
+
+_REG, _LBL, _NUM = _KW_REGISTER, _KW_LABEL, _TK_NUMBER
+
+# Operand tags -> handler deducing the instruction type and filling it in;
+# The tag tuple carries the operand count as its length
+_OPERAND_DISPATCH: dict[tuple[int, ...], Callable[[Instruction, list[Token]], None]] = {
+    (_REG, _REG, _REG): _setRType,
+    (_REG, _REG, _LBL): _setITypeLabel,
+    (_REG, _REG, _NUM): _setITypeNumber,
+    (_REG, _REG)      : _setUType,
+    (_REG,)           : _setSType,
+    (_LBL,)           : _setJTypeLabel,
+    (_NUM,)           : _setJTypeNumber
+}
+
+# Error reported for an operand pattern without handler, by operand count
+_OPERAND_ERRORS: tuple[(str | None), ...] = (
+    None,
+    "TextSegment: Unexpected token.",
+    "TextSegment: U-type instruction missing Rd or Rm.",
+    "TextSegment: R-type or I-type instruction missing Rd and Rm."
+)
+
+
+def _allowedTypeMasks(
+        lookup_table: dict[InstructionType, tuple[str, ...]]) -> dict[str, int]:
+    """
+    Invert the opcode lookup table into casefolded opcode -> type mask;
+    Bit n is set when the type with Instruction.type_lut value n is allowed.
+    """
 
-        # Keep a list of used labels
-        self.used_label: list[str] = list()
+    masks: dict[str, int] = dict()
 
-        # Logging facility
-        self.logger: logging.Logger = logger
+    for type, codes in lookup_table.items():
+        for code in codes:
+            code_cf: str = code.casefold()
+            masks[code_cf] = masks.get(code_cf, 0) | (1 << Instruction.type_lut[type])
     
-    class StateMachine:
-        """ Use state machine to check grammer validity. """
+    return masks
 
-        @enum.unique
-        class States(enum.Enum):
-            COMMA = enum.auto()
-            OTHER = enum.auto()
 
-        def reset(self) -> None:
-            """ Reset current state to starting state. """
-            self.state = TextSegment.StateMachine.States.OTHER
-        
-        def __init__(self) -> None:
-            self.state: TextSegment.StateMachine.States
+class TextSegment:
+    """ Parse and record information about text segment. """
 
-            # Initialize by reseting
-            self.reset()
+    def __init__(self) -> None:
+        """ Initialize data container. """
 
-        @staticmethod
-        def isComma(token: Token) -> bool:
-            return (
-                token.type == Token.TokenType.SPECIAL and 
-                token.value == ","
-            )
-        
-        @staticmethod
-        def isOther(token: Token) -> bool:
-            # Other can be register, number, label
-            return (
-                Keywords.isRegister(token) or
-                token.type == Token.TokenType.NUMBER or
-                Keywords.isLabel(token)
-            )
-        
-        def update(self, token: Token) -> bool:
-            """
-            Update current state with token;
-            Return the validity of grammar.
-            """
-
-            if self.state == TextSegment.StateMachine.States.OTHER:
-                # Expect the token to be other
-                if self.isOther(token):
-                    self.state = TextSegment.StateMachine.States.COMMA
-                    return True
-                else:
-                    return False
-
-            elif self.state == TextSegment.StateMachine.States.COMMA:
-                # Expect the token to be a comma
-                if self.isComma(token):
-                    self.state = TextSegment.StateMachine.States.OTHER
-                    return True
-                else:
-                    return False
-
-            # Other than those, return False anyways
-            return False
+        # Sequentially stores instructions
+        self.instruction: list[Instruction] = list()
+
+        # Label as key - Index of the labeled instruction as value;
+        # Also tells which labels are already used
+        self.symbol_table: dict[str, int] = dict()
+    
+    @staticmethod
+    def isComma(token: Token) -> bool:
+        return (
+            token.type == _T_SPECIAL and 
+            token.value == ","
+        )
+    
+    @staticmethod
+    def isOther(token: Token) -> bool:
+        # Other can be register, number, label
+        return bool(token.kind & _KIND_OTHER_MASK)
     
     class ValidateOpcodeType:
         """ Check if the opcode can have certain type. """
 
-        lookup_table: dict[Instruction.InstructionType, tuple[str, ...]] = {
-            Instruction.InstructionType.Rt: (
+        lookup_table: dict[InstructionType, tuple[str, ...]] = {
+            InstructionType.Rt: (
                 'ADD', 'UMUL', 'UDIV', 'UMOL', 'AND',
                 'ORR', 'XOR' , 'SHL' , 'RTL' , 'RTR'
             ),
-            Instruction.InstructionType.It: (
+            InstructionType.It: (
                 'ADD', 'UMUL', 'UDIV', 'UMOL', 'AND',
                 'ORR', 'XOR' , 'SHL' , 'RTL' , 'RTR'
             ),
-            Instruction.InstructionType.Ut: (
+            InstructionType.Ut: (
                 'NOT', 'LDR', 'STR'
             ),
-            Instruction.InstructionType.St: (
+            InstructionType.St: (
                 'PUSH', 'POP'
             ),
-            Instruction.InstructionType.Jt: (
+            InstructionType.Jt: (
                 'JMP', 'JZ', 'JN' ,
                 'JC' , 'JV', 'JZN',
                 'SYSCALL'
             )
         }
 
+        # Casefolded opcode -> mask of its allowed types
+        _allowed_types_cf: dict[str, int] = _allowedTypeMasks(lookup_table)
+
         @classmethod
         def validate(cls, inst: Instruction) -> bool:
             """ Validate opcode and optype """
-            return caselessIn(inst.code, cls.lookup_table[inst.type])
+            return bool(
+                (cls._allowed_types_cf.get(inst.code.casefold(), 0) >>
+                 Instruction.type_lut[inst.type]) & 1
+            )
 
-    def parse(self, token_stream: list[Token]) -> None:
-        """ Parse the token stream. """
+    def parseLabel(
+            self,
+            inst: Instruction,
+            identifier: Token,
+            tokens: Iterator[Token]) -> None:
+        """ Parse the label part of instruction; Consumes the ':' from tokens. """
 
-        inst: Instruction = Instruction()
+        assert Keywords.isLabel(identifier)
 
-        # Two possibilities: Code with label, and code that don't
+        # Label must not be defined before
+        if identifier.value in self.symbol_table:
+            _log.error("TextSegment: Label redefinition.")
+            exitProgram(1)
+            return
 
-        def parseLabel() -> None:
-            """ Parse the label part of instruction """
-            nonlocal inst
-            nonlocal token_stream
+        # Validate if there is a ':' followed
+        separator: Token = next(tokens)
 
-            identifier: Token = token_stream.pop(0)
-            assert Keywords.isLabel(identifier)
+        if (separator.type  != _T_SPECIAL or
+            separator.value != ":"):
+            _log.error(
+                "TextSegment: No ':' following label declaration."
+            )
+            exitProgram(1)
+            return
+        
+        # Now the label is validated; The instruction
+        # will be appended at the current end
+        inst.label = identifier.value
+        self.symbol_table[identifier.value] = len(self.instruction)
+        return
+    
+    def parseOpcode(self, inst: Instruction, identifier: Token) -> None:
+        """ Parse the Opcode of the instruction. """
 
-            # Label must not be defined before
-            if identifier.value in self.used_label:
-                self.logger.error("TextSegment: Label redefinition.")
-                exitProgram(1)
-                return
+        assert Keywords.isOpcode(identifier)
 
-            # Validate if there is a ':' followed
-            separator: Token = token_stream.pop(0)
+        # Simply store the opcode
+        inst.code = identifier.value
+        return
 
-            if (separator.type  != Token.TokenType.SPECIAL or
-                separator.value != ":"):
-                self.logger.error(
-                    "TextSegment: No ':' following label declaration."
-                )
-                exitProgram(1)
-                return
-            
-            # Now the label is validated
-            inst.label = identifier.value
-            self.used_label.append(identifier.value)
-            return
-        
-        def parseOpcode() -> None:
-            """ Parse the Opcode of the instruction. """
-            nonlocal inst
-            nonlocal token_stream
+    def parse(self, token_stream: Iterable[Token]) -> None:
+        """ Parse the token stream. """
 
-            identifier: Token = token_stream.pop(0)
-            assert Keywords.isOpcode(identifier)
+        inst: Instruction = Instruction()
+
+        # Walk the stream with an iterator; Tokens may come
+        # straight from the lexer without a list in between
+        tokens: Iterator[Token] = iter(token_stream)
+        first: Token = next(tokens)
+
+        # Two possibilities: Code with label, and code that don't
 
-            # Simply store the opcode
-            inst.code = identifier.value
-            return
-        
         # First validate if any instruction start with a label or a opcode
-        if (not Keywords.isLabel(token_stream[0]) and
-            not Keywords.isOpcode(token_stream[0])):
-            self.logger.error(
+        if (not Keywords.isLabel(first) and
+            not Keywords.isOpcode(first)):
+            _log.error(
                 "TextSegment: Instruction not start with label or Opcode."
             )
             exitProgram(1)
             return
         
         # If the instruction starts with a label
-        if Keywords.isLabel(token_stream[0]):
-            parseLabel()
+        if Keywords.isLabel(first):
+            self.parseLabel(inst, first, tokens)
+            first = next(tokens)
 
         # Then we parse opcode anyways
-        parseOpcode()
+        self.parseOpcode(inst, first)
 
-        # For instructions with opcode only (such as 'END')
-        if len(token_stream) == 0:
-            # Record instruction and leave
-            self.instruction.append(inst)
-            return
-        
         # Use the state machine to extract relavant information and validate grammar.
-        sm = TextSegment.StateMachine()
+        state: (int | None) = _ST_OTHER
 
         values: list[Token] = list()
 
-        for token in token_stream:
+        # Bind the lookups used for every operand once
+        append = values.append
+        isOther = TextSegment.isOther
+        isComma = TextSegment.isComma
+        transition = _TEXT_TRANS.get
+
+        for token in tokens:
+            # Classify the token once for both the transition and storing
+            if isOther(token):
+                kind: int = _KIND_OTHER
+            elif isComma(token):
+                kind = _KIND_COMMA
+            else:
+                kind = _KIND_ELSE
+
             # Check syntax error
-            if not sm.update(token):
-                self.logger.error(
+            state = transition((state, kind))
+            if state is None:
+                _log.error(
                     "TextSegment: Opcode operands syntax error."
                 )
                 exitProgram(1)
                 return
             
             # Store valuable token
-            if TextSegment.StateMachine.isOther(token):
-                values.append(token)
-        
-        # Next analyze the value list
-
-        def analyzeValueList(value_list: list[Token]) -> None:
-            """
-            Analyze value list to obtain register and imm information;
-            Deduce instruction type;
-            Fill instruction member.
-            """
-            nonlocal inst
-
-            # Validate the minimum length
-            assert len(value_list) >= 1
-            # Validate the maximum length
-            if len(value_list) > 3:
-                self.logger.error(
-                    "TextSegment: Too many operands in one instruction."
-                )
-                exitProgram(1)
-                return
-            
-            # Now start parsing operands
-            match len(value_list):
-                case 3:
-                    # If length is 3, then either Rt or It
-                    if (not Keywords.isRegister(value_list[0]) or
-                        not Keywords.isRegister(value_list[1])):
-                        self.logger.error(
-                            "TextSegment: "
-                            "R-type or I-type instruction missing Rd and Rm."
-                        )
-                        exitProgram(1)
-                        return
-                    
-                    inst.Rd = value_list[0].value
-                    inst.Rm = value_list[1].value
-
-                    if Keywords.isRegister(value_list[2]):
-                        # If the last operand is a register, then R-type.
-                        inst.type = Instruction.InstructionType.Rt
-                        inst.Rn = value_list[2].value
-
-                    elif Keywords.isLabel(value_list[2]):
-                        # If the last operand is a label, then I-type.
-                        inst.type = Instruction.InstructionType.It
-                        inst.imm = value_list[2].value
-                    
-                    elif value_list[2].type == Token.TokenType.NUMBER:
-                        # If the last operand is a number, then I-type.
-                        inst.type = Instruction.InstructionType.It
-                        try:
-                            inst.imm = int(value_list[2].value)
-                        except ValueError:
-                            self.logger.error(
-                                "TextSegment: "
-                                "Failed to convert imm to integer."
-                            )
-                            exitProgram(1)
-                            return
-                    
-                    else:
-                        self.logger.error(
-                            "TextSegment: Unexpected token."
-                        )
-                        exitProgram(1)
-                        return
-                    
-                    return
-                
-                case 2:
-                    # If length is 2, then only U-type instruction
-                    if (not Keywords.isRegister(value_list[0]) or
-                        not Keywords.isRegister(value_list[1])):
-                        self.logger.error(
-                            "TextSegment: "
-                            "U-type instruction missing Rd or Rm."
-                        )
-                        exitProgram(1)
-                        return
-                    
-                    inst.type = Instruction.InstructionType.Ut
-                    inst.Rd = value_list[0].value
-                    inst.Rm = value_list[1].value
+            if kind == _KIND_OTHER:
+                append(token)
 
-                    return
-                
-                case 1:
-                    # If length is 1, then either S-type or J-type
-                    value: Token = value_list.pop(0)
-
-                    if Keywords.isRegister(value):
-                        # If the operand is a register, then S-type
-                        inst.type = Instruction.InstructionType.St
-                        inst.Rd = value.value
-                    
-                    elif Keywords.isLabel(value):
-                        # If the operand is a label, then J-type
-                        inst.type = Instruction.InstructionType.Jt
-                        inst.imm = value.value
-                    
-                    elif value.type == Token.TokenType.NUMBER:
-                        # If the operand is a number, then J-type
-                        inst.type = Instruction.InstructionType.Jt
-                        try:
-                            inst.imm = int(value.value)
-                        except ValueError:
-                            self.logger.error(
-                                "TextSegment: "
-                                "Failed to convert imm to integer."
-                            )
-                            exitProgram(1)
-                            return
-                    
-                    else:
-                        self.logger.error(
-                            "TextSegment: Unexpected token."
-                        )
-                        exitProgram(1)
-                        return
-                    
-                    return
-                
-                case default:
-                    self.logger.error("TextSegment: Unexpected Error!")
-                    exitProgram(1)
-                    return
+        # For instructions with opcode only (such as 'END')
+        if len(values) == 0:
+            # Record instruction and leave
+            self.instruction.append(inst)
+            return
         
-        # Call the function
-        analyzeValueList(values)
+        # Next analyze the value list;
+        # The operand tags select the handler deducing the instruction type
+        if len(values) > 3:
+            _log.error(
+                "TextSegment: Too many operands in one instruction."
+            )
+            exitProgram(1)
+            return
+
+        handler = _OPERAND_DISPATCH.get(
+            tuple([token.kind & _OPERAND_TAGS for token in values])
+        )
+        if handler is None:
+            _log.error(_OPERAND_ERRORS[len(values)])
+            exitProgram(1)
+            return
+
+        handler(inst, values)
 
         # Need to validate if the code match the type
         if not TextSegment.ValidateOpcodeType.validate(inst):
-            self.logger.error(
+            _log.error(
                 "TextSegment: Opcode and Optype mismatch."
             )
             exitProgram(1)
@@ -1127,16 +1158,9 @@ class TextSegment:
         return len(self.instruction)
     
     def symbolTable(self) -> dict[str, int]:
-        """ Parse instruction label into local symbol table. """
+        """ Local symbol table of this segment; Not to be modified. """
 
-        symbol_table: dict[str, int] = dict()
-
-        for idx, inst in enumerate(self.instruction):
-            if inst.label is None:
-                continue
-            symbol_table[inst.label] = idx
-        
-        return symbol_table
+        return self.symbol_table
 
 
 @enum.unique
@@ -1149,47 +1173,52 @@ class SegmentType(enum.Enum):
         return self.value
 
 
-def parseSegmentLabel(
-        logger: logging.Logger,
-        token_stream: list[Token]) -> (None | SegmentType):
-    """ Parse the segment label; Return the segment type. """
+# Casefolded segment name -> segment type
+_SEGMENT_MAP: dict[str, SegmentType] = {
+    sys.intern(label.casefold()): type
+    for label, type in zip(
+        Keywords.segments,
+        (SegmentType.DATA, SegmentType.EXTRA, SegmentType.TEXT)
+    )
+}
+
+
+def parseSegmentLabel(token_stream: list[Token]) -> (None | SegmentType):
+    """
+    Parse the segment label; Return the segment type.
+    The token stream is not modified.
+    """
 
     # In case non-label declaration code is passed in:
     # Return None to signal not segment declaration
-    symbol: Token = token_stream.pop(0)
-    if (symbol.type  != Token.TokenType.SPECIAL or
+    symbol: Token = token_stream[0]
+    if (symbol.type  != _T_SPECIAL or
         symbol.value != "."):
         return None
     
     # Here the token stream must be a segment declaration
     # Validate the length
-    if len(token_stream) != 1:
-        logger.error("SegmentLabel: Unexpected number of tokens.")
+    if len(token_stream) != 2:
+        _log.error("SegmentLabel: Unexpected number of tokens.")
         exitProgram(1)
         return
     
-    segment: Token = token_stream.pop(0)
+    segment: Token = token_stream[1]
     # Validate the type
     if not Keywords.isSegment(segment):
-        logger.error("SegmentLabel: Invalid segment symbol.")
+        _log.error("SegmentLabel: Invalid segment symbol.")
         exitProgram(1)
         return
     
     # Pick the correct enum and return segment type
-    segment_type: tuple[SegmentType, ...] = (
-        SegmentType.DATA,
-        SegmentType.EXTRA,
-        SegmentType.TEXT
-    )
+    segment_type: (SegmentType | None) = _SEGMENT_MAP.get(segment.cf)
 
-    for label, type in zip(Keywords.segments, segment_type):
-        # Check for the matching label
-        if caselessCompare(label, segment.value):
-            return type
-    else:
-        logger.error("SegmentLabel: Invalid segment symbol.")
+    if segment_type is None:
+        _log.error("SegmentLabel: Invalid segment symbol.")
         exitProgram(1)
         return
+    
+    return segment_type
 
 
 class Parser:
@@ -1197,89 +1226,95 @@ class Parser:
 
     def __init__(
             self,
-            logger  : logging.Logger,
             filepath: str) -> None:
         """ Initialize variables and segments. """
 
-        self.logger: logging.Logger = logger
         self.filepath: str = filepath
 
         # Three segments
-        self.ds: DataSegment  = DataSegment(self.logger)
-        self.es: ExtraSegment = ExtraSegment(self.logger)
-        self.ts: TextSegment  = TextSegment(self.logger)
+        self.ds: DataSegment  = DataSegment()
+        self.es: ExtraSegment = ExtraSegment()
+        self.ts: TextSegment  = TextSegment()
 
     def parse(self) -> None:
         """ Parse the file line by line into an intermediate representation. """
 
         # Validate file extension
         if not self.filepath.endswith(".asm"):
-            self.logger.error("Invalid file name extension.")
+            _log.error("Invalid file name extension.")
             exitProgram(1)
             return
         
         # Validate the file path
         if not os.path.exists(self.filepath):
-            self.logger.error("File path does not exist.")
+            _log.error("File path does not exist.")
             exitProgram(1)
             return
         
         # The active segment will be responsible for parsing
         active_segment: (DataSegment | ExtraSegment | TextSegment | None) = None
 
-        def switchSegment(segment_type: (SegmentType | None)) -> bool:
-            """ Attempt to switch segment; Return true if did. """
-            nonlocal active_segment
-
-            match segment_type:
-                case SegmentType.DATA:
-                    active_segment = self.ds
-                    return True
-
-                case SegmentType.EXTRA:
-                    active_segment = self.es
-                    return True
-
-                case SegmentType.TEXT:
-                    active_segment = self.ts
-                    return True
-
-                case None:
-                    # Current line of code is not segment declaration
-                    return False
-            
-            # Unknown match fall through
-            self.logger.error("Unknown segment type.")
-            exitProgram(1)
-            return False
-        
         # Now parse the file line by line
         for line in asmReaderGenerator(self.filepath):
-            # Obtain the token stream
-            token_stream: list[Token] = lexer(line)
+            # Lex lazily; The first token is enough to tell
+            # a segment declaration apart from the other lines
+            tokens: Iterator[Token] = lex_iter(line)
+            first: (Token | None) = next(tokens, None)
+
+            # Nothing to parse on this line
+            if first is None:
+                continue
 
             # Attempt to switch segment first
-            if  switchSegment(
-                    parseSegmentLabel(
-                        self.logger,
-                        # MUST copy the token stream here!
-                        [token for token in token_stream]
-                    )
-                ):
-                # If switch segment is successful, then ignore the line
+            if (first.type  == _T_SPECIAL and
+                first.value == "."):
+                segment = self.switchSegment(
+                    parseSegmentLabel([first, *tokens])
+                )
+                if segment is not None:
+                    active_segment = segment
+                # Either way, the declaration line is done
                 continue
 
             # The active segment should never be None
             if active_segment is None:
-                self.logger.error("Missing segment declaration.")
+                _log.error("Missing segment declaration.")
                 exitProgram(1)
                 return
             
-            # Use the active segment to parse the line
+            token_stream: Iterator[Token] = itertools.chain((first,), tokens)
+
+            # Use the active segment to parse the line;
+            # Every segment consumes the tokens straight from the lexer
             active_segment.parse(token_stream)
         
         return
     
+    def switchSegment(
+            self,
+            segment_type: (SegmentType | None)
+        ) -> (DataSegment | ExtraSegment | TextSegment | None):
+        """ Return the segment to switch to; None if not a segment declaration. """
+
+        # Plain identity tests on the enum members
+        if segment_type is SegmentType.DATA:
+            return self.ds
+
+        elif segment_type is SegmentType.EXTRA:
+            return self.es
+
+        elif segment_type is SegmentType.TEXT:
+            return self.ts
+
+        elif segment_type is None:
+            # Current line of code is not segment declaration
+            return None
+        
+        # Unknown segment type fall through
+        _log.error("Unknown segment type.")
+        exitProgram(1)
+        return None
+    
     def getSymbolTable(self) -> dict[str, int]:
         """ Obtain the global symbol table from each segment. """
 
@@ -1291,29 +1326,27 @@ class Parser:
         es_st: dict[str, int] = self.es.symbolTable()
         ts_st: dict[str, int] = self.ts.symbolTable()
 
-        # Need to make sure no label redefinition.
-        if (len(set(ds_st.keys()) & set(es_st.keys())) != 0 or
-            len(set(ds_st.keys()) & set(ts_st.keys())) != 0 or
-            len(set(es_st.keys()) & set(ts_st.keys())) != 0):
-            self.logger.error("Label redefinition.")
-            exitProgram(1)
-            return
-        
         # Generate the new symbol table
         # Order for segments: data -> extra -> text
         symbol_table.update(ds_st)
 
+        # The segment tables belong to the segments; Offset into the global one
         ds_size: int = self.ds.size() if self.ds.size() > 0 else 1
-        for label in es_st.keys():
-            es_st[label] += ds_size
-
-        symbol_table.update(es_st)
+        symbol_table.update(
+            (label, address + ds_size) for label, address in es_st.items()
+        )
 
         es_size: int = self.es.size() if self.es.size() > 0 else 1
-        for label in ts_st.keys():
-            ts_st[label] = ts_st[label] + es_size + ds_size
+        symbol_table.update(
+            (label, index + es_size + ds_size) for label, index in ts_st.items()
+        )
 
-        symbol_table.update(ts_st)
+        # Need to make sure no label redefinition; Labels are unique within
+        # a segment, so any label shared across segments shrinks the merge
+        if len(symbol_table) != len(ds_st) + len(es_st) + len(ts_st):
+            _log.error("Label redefinition.")
+            exitProgram(1)
+            return
 
         return symbol_table
     
@@ -1335,7 +1368,7 @@ class Parser:
                 inst.imm = symbol_table[inst.imm]
             # Report error when out of range access
             except KeyError:
-                self.logger.error("Access undefined label.")
+                _log.error("Access undefined label.")
                 exitProgram(1)
                 return
         
@@ -1395,8 +1428,7 @@ class CodeGenerator:
             output_path  : str,
             data_segment : DataSegment,
             extra_segment: ExtraSegment,
-            text_segment : TextSegment,
-            logger       : logging.Logger) -> None:
+            text_segment : TextSegment) -> None:
         """ Initialize members. """
 
         # The output path of binary file
@@ -1406,9 +1438,6 @@ class CodeGenerator:
         self.ds: DataSegment = data_segment
         self.es: ExtraSegment = extra_segment
         self.ts: TextSegment = text_segment
-
-        # Logger for error logging
-        self.logger: logging.Logger = logger
     
     def generateHeading(self) -> str:
         """ Generate the heading for binary file. """
@@ -1467,7 +1496,7 @@ class CodeGenerator:
 
             # Type
             if inst.type is None:
-                self.logger.error(
+                _log.error(
                     "CodeGeneration: Instruction type is None."
                 )
                 exitProgram(1)
@@ -1478,10 +1507,10 @@ class CodeGenerator:
 
             # Code
             if (inst.code is None or
-                not caselessIn(inst.code, Keywords.OpCode) or
+                inst.code.casefold() not in Keywords._opcodes_cf or
                 len(bin(Keywords.OpCode.index(inst.code.upper()))[2:]) > EncodingRules.op_code.length
                 ):
-                self.logger.error(
+                _log.error(
                     "CodeGeneration: Invalid instruction code."
                 )
                 exitProgram(1)
@@ -1501,7 +1530,7 @@ class CodeGenerator:
                 """ At the end validate instruction length """
 
                 if len(bin(binary)[2:]) > EncodingRules.instruction_width:
-                    self.logger.error(
+                    _log.error(
                         "CodeGeneration: Instruction length exceeds width."
                     )
                     exitProgram(1)
@@ -1515,7 +1544,7 @@ class CodeGenerator:
             
             # Otherwise, use the old shl for imm
             if inst.imm is not None and not isinstance(inst.imm, int):
-                self.logger.error(
+                _log.error(
                     "CodeGeneration: Immediate is not integer."
                 )
                 exitProgram(1)
@@ -1531,7 +1560,7 @@ class CodeGenerator:
         insts: list[int] = list()
 
         for inst in self.ts.instruction:
-            if caselessCompare("END", inst.code):
+            if inst.code.casefold() == "end":
                 # Generate the end signal
                 insts.append(2**EncodingRules.instruction_width - 1)
                 continue
@@ -1545,7 +1574,7 @@ class CodeGenerator:
         """ The function that actually write to file. """
 
         if not self.output_path.endswith(".bin"):
-            self.logger.error("CodeGeneration: Output file with invalid entension.")
+            _log.error("CodeGeneration: Output file with invalid entension.")
             exitProgram(1)
             return
         
@@ -1569,7 +1598,7 @@ def main():
         '%(asctime)s | %(levelname)8s | %(message)s'
     )
 
-    parser = Parser(logger, args.filepath)
+    parser = Parser(args.filepath)
 
     # Parse the file
     logger.info("Start parsing...")
@@ -1590,8 +1619,7 @@ def main():
         args.destpath, 
         parser.ds, 
         parser.es, 
-        parser.ts, 
-        logger
+        parser.ts
     )
 
     # Generate bin file
@@ -17,10 +17,11 @@ This script is used to validate the uniqueness of instruction encodings.
 
 
 import os
+import sys
 import argparse
 import json
 import logging
-import contextlib
+from collections import Counter, namedtuple
 
 
 """ Global variables. """
@@ -85,9 +86,15 @@ class CustomLoggingFormatter(logging.Formatter):
             logging.ERROR   : self.ConsoleColor.red + self.fmt + self.ConsoleColor.reset
         }
 
+        # One formatter per level, built once instead of once per record;
+        # Other levels fall back to the plain default format
+        self._formatters = {
+            level: logging.Formatter(log_fmt) for level, log_fmt in self.FORMAT.items()
+        }
+        self._default_formatter = logging.Formatter()
+
     def format(self, record):
-        log_fmt = self.FORMAT.get(record.levelno)
-        formatter = logging.Formatter(log_fmt)
+        formatter = self._formatters.get(record.levelno, self._default_formatter)
         return formatter.format(record)
 
 
@@ -122,6 +129,10 @@ def exitProgram(exit_code: int) -> None:
 class CommandLineArgs:
     """ Class that stores the command line arguments """
 
+    # populate stores the arguments on the class itself;
+    # Instances hold nothing, so they need no __dict__
+    __slots__ = ()
+
     inst_encoding: str    # Path to the instruction encoding file.
     inst_definition: str  # Path to the instruction definition file.
 
@@ -183,12 +194,32 @@ def JSON2Dict(files: dict[str, str]) -> dict[str, dict]:
     results: dict[str, dict] = dict()
 
     for file, path in files.items():
-        with contextlib.closing(open(path)) as json_file:
-            results[file] = json.load(json_file)
+        # Read each file in one go and parse the whole buffer
+        with open(path, 'rb') as json_file:
+            results[file] = json.loads(json_file.read())
     
     return results
 
 
+def internFields(definition: dict) -> None:
+    """ Intern the short, repeating identifier strings of every instruction. """
+
+    # Malformed definitions are reported by the testcases
+    if type(definition) is not dict:
+        return
+
+    for v in definition.values():
+        if type(v) is not dict:
+            continue
+
+        for field in ("type", "opcode", "funct3", "funct7"):
+            value = v.get(field)
+            if type(value) is str:
+                v[field] = sys.intern(value)
+    
+    return
+
+
 # # # # # # # # # # #
 #     Testcases
 # # # # # # # # # # #
@@ -197,9 +228,9 @@ def JSON2Dict(files: dict[str, str]) -> dict[str, dict]:
 def testcase(func: Callable) -> Callable:
     """ Testcase decorator. """
     
-    def wrapper():
+    def wrapper(*args):
         try:
-            func()
+            func(*args)
         except AssertionError as ae:
             logger.error(ae)
             exitProgram(1)
@@ -213,26 +244,85 @@ def testcase(func: Callable) -> Callable:
     return wrapper
 
 
-@testcase
-def TC1():
-    """ Check all instruction types defined in inst_definition has a corresponding encoding. """
-    
-    inst_type = set(encoding.keys())
-    
-    assert len(inst_type) == len(encoding.keys()), "Instruction type is not uniquely defined."
+# Result of the shared pass over the instruction definitions
+DefinitionPass = namedtuple("DefinitionPass", ["non_dict", "untyped", "fields", "counts"])
+
+
+def _validateAll(encoding: dict, definition: dict) -> DefinitionPass:
+    """
+    Single pass over the instruction definitions, shared by the testcases;
+    Nothing is asserted here, each testcase reports its own failures.
+
+    non_dict: first instruction that is not a dictionary, None if all are
+    untyped : first instruction whose type has no encoding, None if all have one
+    fields  : (name, opcode, funct3, funct7) of each instruction, None if missing
+    counts  : number of instructions per (opcode,), (funct3, opcode), (funct7, funct3, opcode)
+    """
+
+    non_dict: (str | None) = None
+    untyped : (str | None) = None
+
+    # Dictionary keys are unique already, so the types need no uniqueness check
+    inst_type = frozenset(encoding)
+
+    fields: list[tuple[str, Any, Any, Any]] = list()
+    counts: Counter = Counter()
+
+    # Bound once, not looked up for every instruction
+    append = fields.append
+    is_type = inst_type.__contains__
     
     for k, v in definition.items():
-        assert isinstance(v, dict), \
-               f"Instruction {k} is not of dictionary type."
-        
-        assert v.get("type") in inst_type, \
-               f"Instruction {k} type is not defined in encoding.json."
+        # JSON objects always load as plain dict; An exact type test is enough
+        if type(v) is not dict:
+            if non_dict is None:
+                non_dict = k
+            continue
+
+        # Only an unknown type seen before any non-dictionary is reported first
+        if untyped is None and non_dict is None and not is_type(v.get("type")):
+            untyped = k
+
+        # Each instruction is decomposed once
+        op, f3, f7 = v.get("opcode"), v.get("funct3"), v.get("funct7")
+        append((k, op, f3, f7))
+
+        # Instructions without funct3 are only told apart by opcode,
+        # which is still okay.
+        counts[(op,)] += 1
+
+        if f3 is not None:
+            counts[(f3, op)] += 1
+
+            if f7 is not None:
+                counts[(f7, f3, op)] += 1
+    
+    return DefinitionPass(non_dict, untyped, fields, counts)
+
+
+@testcase
+def TC1(passes: DefinitionPass):
+    """ Check all instruction types defined in inst_definition has a corresponding encoding. """
+
+    assert passes.untyped is None, \
+           f"Instruction {passes.untyped} type is not defined in encoding.json."
+
+    assert passes.non_dict is None, \
+           f"Instruction {passes.non_dict} is not of dictionary type."
     
     return
 
 
+# Identifier presence bits -> (slice start into (funct7, funct3, opcode), error)
+IDENTIFIER_CASES: dict[int, tuple[int, str]] = {
+    0b111: (0, "funct7, funct3, and opcode does not uniquely identify instruction"),  # Case 3
+    0b110: (1, "funct3 & opcode does not uniquely identify instruction"),             # Case 2
+    0b100: (2, "Only the opcode does not uniquely identify instruction")              # Case 1
+}
+
+
 @testcase
-def TC2():
+def TC2(passes: DefinitionPass):
     """ Check all instructions' opcodes and funct3/7 defined in inst_definition are unique. """
 
     """
@@ -247,124 +337,76 @@ def TC2():
 
     """
 
-    for k, v in definition.items():
-        # 3 cases (v contain only opcode, both opcode and funct3, and all 3 identifiers)
-
-        assert isinstance(v, dict), f"Instruction {k} is not of dictionary type."
-
-        # Case 3
-        if "funct7" in v:
-            assert "funct3" in v and "opcode" in v, \
-                   f"Instruction {k} has funct7, but doesn't have funct3 or opcode"
-            
-            # The opcode, funct7, and funct3 combined should uniquely identify that instruction
-            encounter: int = 0
-
-            for encoding in definition.values():
-                # Concat checker's opcode, funct3, and funct7
-                checker = v.get("funct7") + v.get("funct3") + v.get("opcode")
-                # Concat target's opcode, funct3, and funct7
-                # Assumption: ALL instruction MUST have the opcode section!
-                assert "opcode" in encoding, "Some instruction doesn't contain opcode!"
-                if "funct7" not in encoding:
-                    continue
-                
-                target = encoding.get("funct7")   \
-                         + encoding.get("funct3") \
-                         + encoding.get("opcode")
-                
-                if checker == target:
-                    encounter += 1
-            
-            assert encounter == 1, \
-                   f"funct7, funct3, and opcode does not uniquely identify instruction {k}"
-
-        # Case 2
-        elif "funct3" in v:
-            assert "funct7" not in v and "opcode" in v, \
-                   f"Instruction {k} has funct3, but has funct7 or doesn't have opcode"
-            
-            # The opcode and funct3 combined should uniquely identify that instruction
-            encounter: int = 0
-
-            for encoding in definition.values():
-                # Concat checker's opcode and funct3
-                checker = v.get("funct3") + v.get("opcode")
-                # Concat target's opcode and funct3
-                # Assumption: ALL instruction MUST have the opcode section!
-                assert "opcode" in encoding, "Some instruction doesn't contain opcode!"
-                # But if the target doesn't have funct3, it will be checked in the
-                # next 'elif' clause, which is still okay.
-                if "funct3" not in encoding:
-                    continue
-                
-                target = encoding.get("funct3") + encoding.get("opcode")
-
-                if checker == target:
-                    encounter += 1
-            
-            assert encounter == 1, \
-                   f"funct3 & opcode does not uniquely identify instruction {k}"
+    assert passes.non_dict is None, \
+           f"Instruction {passes.non_dict} is not of dictionary type."
 
-        # Case 1
-        elif "opcode" in v:
-            assert "funct3" not in v and "funct7" not in v, \
-                   f"Instruction {k} has opcode, but has funct3 or funct7"
+    # The identifiers and their counts come from the shared pass
+    # over the definitions; No need to rescan all instructions per instruction.
+    fields, counts = passes.fields, passes.counts
 
-            # Only the opcode should uniquely identify that instruction
-            encounter: int = 0
+    # Assumption: ALL instruction MUST have the opcode section!
+    assert (None,) not in counts, "Some instruction doesn't contain opcode!"
 
-            for encoding in definition.values():
-                # Assumption: ALL instruction MUST have the opcode section!
-                assert "opcode" in encoding, "Some instruction doesn't contain opcode!"
+    for k, op, f3, f7 in fields:
+        # 3 cases (v contain only opcode, both opcode and funct3, and all 3 identifiers);
+        # Pack which identifiers are present into opcode/funct3/funct7 bits
+        mask: int = (op is not None) << 2 | (f3 is not None) << 1 | (f7 is not None)
 
-                if v.get("opcode") == encoding.get("opcode"):
-                    encounter += 1
-            
-            assert encounter == 1, \
-                   f"Only the opcode does not uniquely identify instruction {k}"
+        # With the opcode present, the only invalid combination is funct7 without funct3
+        case = IDENTIFIER_CASES.get(mask)
+        assert case is not None, \
+               f"Instruction {k} has funct7, but doesn't have funct3"
+        
+        # The present identifiers combined should uniquely identify that instruction
+        start, message = case
+        assert counts[(f7, f3, op)[start:]] == 1, f"{message} {k}"
     
     return
 
 
 @testcase
-def TC3():
+def TC3(passes: DefinitionPass):
     """ Check all instruction definitions follows the format defined in inst_encodings.json. """
 
-    for k, v in definition.items():
-        assert isinstance(v, dict), f"Instruction {k} is not of dictionary type."
+    # Defined once, instead of once per instruction
+    def checkExists(k: str, v: dict, inst_type: str, details: dict, entry: str) -> None:
+        if entry in v:
+            assert entry in details, \
+                   f"{entry} in {k}, but is not defined in {inst_type}"
+            
+            # Check for encoding length
+            check_len: int = len(v.get(entry))
+
+            ran = details.get(entry)
+            assert isinstance(ran, list) and len(ran) == 2, \
+                   f"Unexpected format to specify encoding of type {inst_type}"
+            
+            target_len: int = ran[1] - ran[0] + 1
+
+            assert check_len == target_len, \
+                   f"{entry} length does not match for {k} and it's encoding."
 
+        else:
+            assert entry not in details, \
+                   f"{entry} not in {k}, but is defined in {inst_type}"
+
+    assert passes.non_dict is None, \
+           f"Instruction {passes.non_dict} is not of dictionary type."
+
+    # Bound once, not looked up for every instruction
+    get_details = encoding.get
+
+    for k, v in definition.items():
         inst_type = v.get("type")
         assert inst_type in encoding, \
                f"Unknown instruction type {inst_type} for instruction {k}"
         
-        details: dict = encoding.get(inst_type)
-
-        def checkExists(entry: str) -> None:
-            if entry in v:
-                assert entry in details, \
-                       f"{entry} in {k}, but is not defined in {inst_type}"
-                
-                # Check for encoding length
-                check_len: int = len(v.get(entry))
-
-                ran = details.get(entry)
-                assert isinstance(ran, list) and len(ran) == 2, \
-                       f"Unexpected format to specify encoding of type {inst_type}"
-                
-                target_len: int = ran[1] - ran[0] + 1
-
-                assert check_len == target_len, \
-                       f"{entry} length does not match for {k} and it's encoding."
-
-            else:
-                assert entry not in details, \
-                       f"{entry} not in {k}, but is defined in {inst_type}"
+        details: dict = get_details(inst_type)
         
         # Now check for 3 instruction identifiers
-        checkExists("opcode")
-        checkExists("funct3")
-        checkExists("funct7")
+        checkExists(k, v, inst_type, details, "opcode")
+        checkExists(k, v, inst_type, details, "funct3")
+        checkExists(k, v, inst_type, details, "funct7")
 
     return
 
@@ -397,10 +439,22 @@ def main():
         exitProgram(1)
         return
     
+    # Identifiers are hashed and compared over and over by the testcases
+    internFields(definition)
+
+    # One pass over the definitions, shared by the testcases;
+    # Failures are left for the testcases to report
+    try:
+        passes: DefinitionPass = _validateAll(encoding, definition)
+    except Exception as e:
+        logger.error(f"Unexpected exception: {e}")
+        exitProgram(1)
+        return
+
     # Testcases
-    TC1()
-    TC2()
-    TC3()
+    TC1(passes)
+    TC2(passes)
+    TC3(passes)
 
     return
 